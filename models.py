@@ -26,6 +26,11 @@ class GraphState(BaseModel):
     general_context: str
     schema_snapshot: str
     example_queries: str
+    # SQLite database the SQL nodes query; falls back to $SQLITE_DB_PATH
+    db_path: Optional[str] = None
+
+    # Process and plan produced ahead of time by a batched planning call
+    plan_bundle: Optional[Dict[str, Any]] = None
 
     # High-level textual plan from the first LLM call
     process: Optional[List[str]] = None
@@ -37,11 +42,13 @@ class GraphState(BaseModel):
     artifacts: Dict[str, Any] = Field(default_factory=dict)
 
     executed_queries: Dict[str, Any] = Field(default_factory=dict)
+    # The SQL behind each result_* artifact, for its SQL_RESULT_ANALYZER
+    artifact_to_sql: Dict[str, str] = Field(default_factory=dict)
 
     # Runtime bookkeeping
     node_status: Dict[str, NodeStatus] = Field(default_factory=dict)
-    current_node_id: Optional[str] = None
-    last_output: Optional[Dict[str, Any]] = None
+    # Nodes that have not started yet, in plan order
+    pending_node_ids: List[str] = Field(default_factory=list)
 
     # Safety caps
     total_attempts: int = 0
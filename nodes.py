@@ -1,19 +1,31 @@
 # nodes.py
 from __future__ import annotations
 
-import json
+import asyncio
+import collections
+import concurrent.futures
+import functools
+import hashlib
 import os
 import re
 import sqlite3
+import threading
 import time
-from typing import Any, Dict, List, Optional, Tuple
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
 
+import numpy as np
+import orjson
 from langchain.chat_models import init_chat_model
-from pydantic import BaseModel, Field
+from langchain_community.cache import SQLiteCache
+from langchain_core.globals import set_llm_cache
+from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from pydantic import BaseModel, Field, ValidationError
 
 from models import GraphState, NodeStatus
 from prompts import (
-    process_analyzer_prompt,
+    plan_bundle_prompt,
+    batch_plan_bundle_prompt,
     planner_prompt,
     analyzer_prompt,
     sql_node_prompt,
@@ -21,46 +33,119 @@ from prompts import (
 )
 
 # --- LLM and Chain Setup ---
-# Use a model that supports structured output well
+# Use a model that supports structured output well. Output is bounded
+# explicitly; on 2.5 models the cap also covers thinking tokens, so those get
+# their own budget inside it.
+
+model = init_chat_model(
+    "gemini-2.5-flash",
+    model_provider="google_genai",
+    temperature=0,
+    thinking_budget=1024,
+    max_output_tokens=4096,
+)
+# Batched planning returns several bundles in one reply, so it gets more room
+batch_model = init_chat_model(
+    "gemini-2.5-flash",
+    model_provider="google_genai",
+    temperature=0,
+    thinking_budget=1024,
+    max_output_tokens=16384,
+)
+# Writing one SQLite statement and summarizing its result are narrow tasks that
+# run once per SQL node, so they go to the smaller, faster model. ANALYZER nodes
+# combine several artifacts and stay on the stronger one.
+fast_model = init_chat_model(
+    "gemini-2.5-flash-lite",
+    model_provider="google_genai",
+    temperature=0,
+    max_output_tokens=1024,
+)
+
+# Byte-identical prompts (retries, repeated requests) are answered from a local
+# cache instead of another Gemini round trip. The cache sits at the model level
+# and is checked on the invoke path, which every chain here uses.
+set_llm_cache(SQLiteCache(database_path=os.getenv("LLM_CACHE_PATH", ".llm_cache.db")))
+
+# Paraphrased requests miss the exact-match cache above, so bootstrap and
+# planner also look up earlier results by request embedding.
+embeddings = GoogleGenerativeAIEmbeddings(model="models/gemini-embedding-001")
+SEMANTIC_CACHE_PATH = Path(
+    os.getenv("SEMANTIC_CACHE_PATH", "output/semantic_cache.json")
+)
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+
+# SQL results keep at most MAX_RESULT_ROWS rows; the result analyzer only
+# sees the first ANALYZER_SAMPLE_ROWS of those plus per-column ranges.
+MAX_RESULT_ROWS = int(os.getenv("MAX_RESULT_ROWS", "500"))
+ANALYZER_SAMPLE_ROWS = int(os.getenv("ANALYZER_SAMPLE_ROWS", "50"))
+
+# Tag on the final ANALYZER call, whose tokens the CLI streams
+FINAL_ANSWER_TAG = "final_answer"
 
-model = init_chat_model("gemini-2.5-flash", model_provider="google_genai")
+# Upper bound on concurrent node executions (and so LLM calls) per frontier
+MAX_CONCURRENCY = int(os.getenv("MAX_CONCURRENCY", "4"))
 
 
-class ProcessAnalyzerOutput(BaseModel):
+class PlanNode(BaseModel):
+    id: str
+    type: str  # SQL | ANALYZER | SQL_RESULT_ANALYZER
+    label: str
+    requires: str  # CSV of artifact ids
+    produces: str  # CSV of artifact ids
+    input: str
+
+
+class ArtifactOutput(BaseModel):
+    id: str
+    value: str
+
+
+class PlanBundleOutput(BaseModel):
     process: List[str]
+    version: str
+    nodes: List[PlanNode]
+    edges: str  # CSV of "src>dst"
+
+
+class PlanBundleBatchOutput(BaseModel):
+    bundles: List[PlanBundleOutput]
 
 
 class PlannerOutput(BaseModel):
     version: str
-    nodes: str  # JSON string
+    nodes: List[PlanNode]
     edges: str  # CSV string
 
 
 class AnalyzerOutput(BaseModel):
     status: str
-    outputs: str  # JSON string
-    notes: Optional[str] = ""
+    outputs: List[ArtifactOutput]
 
 
 class SQLNodeOutput(BaseModel):
     sql: str
-    notes: Optional[str] = ""
 
 
 class SQLResultAnalyzerOutput(BaseModel):
     status: str
-    outputs: str  # JSON string of summaries
-    notes: Optional[str] = ""
+    outputs: List[ArtifactOutput]
 
 
-process_analyzer_chain = process_analyzer_prompt | model.with_structured_output(
-    ProcessAnalyzerOutput
+plan_bundle_chain = plan_bundle_prompt | model.with_structured_output(PlanBundleOutput)
+batch_plan_bundle_chain = batch_plan_bundle_prompt | batch_model.with_structured_output(
+    PlanBundleBatchOutput
 )
 planner_chain = planner_prompt | model.with_structured_output(PlannerOutput)
-analyzer_chain = analyzer_prompt | model.with_structured_output(AnalyzerOutput)
-sql_chain = sql_node_prompt | model.with_structured_output(SQLNodeOutput)
-sql_result_analyzer_chain = sql_result_analyzer_prompt | model.with_structured_output(
-    SQLResultAnalyzerOutput
+sql_chain = sql_node_prompt | fast_model.with_structured_output(SQLNodeOutput)
+# The analyzers run in JSON mode: their reply is plain JSON text, which the CLI
+# can stream token by token when the workflow runs with stream_mode="messages".
+analyzer_chain = analyzer_prompt | model.with_structured_output(
+    AnalyzerOutput, method="json_mode"
+)
+sql_result_analyzer_chain = (
+    sql_result_analyzer_prompt
+    | fast_model.with_structured_output(SQLResultAnalyzerOutput, method="json_mode")
 )
 
 
@@ -80,8 +165,76 @@ def _edges_from_csv(csv: str) -> List[Tuple[str, str]]:
     return edges
 
 
+def _edges_from_artifacts(
+    nodes: List[Dict[str, Any]], strict: bool = True
+) -> List[Tuple[str, str]]:
+    """
+    Derives the edges from the artifact flow: each node depends on the nodes
+    producing what it requires. Raises ValueError if an artifact has no
+    producer, unless `strict` is False, in which case it is skipped.
+    """
+    producers = {}
+    for node in nodes:
+        for artifact in _csv_to_list(node.get("produces", "")):
+            producers.setdefault(artifact, node["id"])
+    edges = {}
+    for node in nodes:
+        for artifact in _csv_to_list(node.get("requires", "")):
+            if artifact not in producers:
+                if not strict:
+                    continue
+                raise ValueError(f"No node produces required artifact: {artifact}")
+            if producers[artifact] != node["id"]:
+                edges[(producers[artifact], node["id"])] = None
+    return list(edges)
+
+
+def _index_plan(plan: Dict[str, Any]) -> None:
+    """
+    Adds lookup tables derived from the node list and edges to the plan, and
+    parses each node's requires/produces CSV once.
+    """
+    for n in plan["nodes"]:
+        n["_requires"] = _csv_to_list(n.get("requires", ""))
+        n["_produces"] = _csv_to_list(n.get("produces", ""))
+    plan["nodes_by_id"] = {n["id"]: n for n in plan["nodes"]}
+    plan["preds"] = {n["id"]: [] for n in plan["nodes"]}
+    plan["succs"] = {n["id"]: [] for n in plan["nodes"]}
+    # Dependencies implied by requires/produces are added to the planner's
+    # edges, so a node is still released when its producer finishes even if
+    # the planner left that edge out
+    edges = dict.fromkeys(plan["edges"])
+    edges.update(dict.fromkeys(_edges_from_artifacts(plan["nodes"], strict=False)))
+    for src, dst in edges:
+        plan["preds"][dst].append(src)
+        plan["succs"][src].append(dst)
+
+    # The answer shown to the user: the plan's only sink, if it is an ANALYZER
+    sinks = [n for n in plan["nodes"] if not plan["succs"][n["id"]]]
+    plan["final_node_id"] = (
+        sinks[0]["id"]
+        if len(sinks) == 1 and sinks[0]["type"].upper() == "ANALYZER"
+        else None
+    )
+
+    # A SQL_RESULT_ANALYZER that only consumes one SQL node's output is fused
+    # into it and runs in the same task, right after the query returns.
+    for n in plan["nodes"]:
+        preds = plan["preds"][n["id"]]
+        if n["type"].upper() != "SQL_RESULT_ANALYZER" or len(preds) != 1:
+            continue
+        sql_node = plan["nodes_by_id"].get(preds[0])
+        if (
+            sql_node is not None
+            and sql_node["type"].upper() == "SQL"
+            and "_fused_sra" not in sql_node
+            and set(n["_requires"]) <= set(sql_node["_produces"])
+        ):
+            sql_node["_fused_sra"] = n["id"]
+
+
 def _get_predecessors(plan: Dict[str, Any], node_id: str) -> List[str]:
-    return [src for src, dst in plan.get("edges", []) if dst == node_id]
+    return plan["preds"].get(node_id, [])
 
 
 def _are_predecessors_succeeded(state: GraphState, node_id: str) -> bool:
@@ -93,26 +246,260 @@ def _are_predecessors_succeeded(state: GraphState, node_id: str) -> bool:
 
 
 def _are_requirements_met(state: GraphState, node: Dict[str, str]) -> bool:
-    required_artifacts = _csv_to_list(node.get("requires", ""))
-    return all(r in state.artifacts for r in required_artifacts)
+    return all(r in state.artifacts for r in node["_requires"])
 
 
 def _get_runnable_nodes(state: GraphState) -> List[Dict[str, str]]:
     if not state.plan:
         return []
     runnable = []
-    for node in state.plan.get("nodes", []):
-        node_id = node["id"]
-        status = state.node_status.get(node_id, NodeStatus())
-        if status.state == "pending":
-            if _are_predecessors_succeeded(state, node_id) and _are_requirements_met(
-                state, node
-            ):
-                runnable.append(node)
+    # Only nodes that have not started yet can become runnable
+    for node_id in state.pending_node_ids:
+        node = state.plan["nodes_by_id"][node_id]
+        if _are_predecessors_succeeded(state, node_id) and _are_requirements_met(
+            state, node
+        ):
+            runnable.append(node)
     return runnable
 
 
+# --- Schema Compaction & Pruning ---
+_CREATE_TABLE_RE = re.compile(
+    r"CREATE TABLE (?:IF NOT EXISTS )?(\w+)\s*\(.*?\n\);", re.IGNORECASE | re.DOTALL
+)
+_CREATE_INDEX_RE = re.compile(
+    r"CREATE (?:UNIQUE )?INDEX [^;]*? ON (\w+)\s*\([^;]*\);", re.IGNORECASE
+)
+_REFERENCES_RE = re.compile(r"REFERENCES (\w+)", re.IGNORECASE)
+
+
+def _compact_ddl(ddl: str) -> str:
+    """Puts one DDL statement on a single line, without comments or padding."""
+    ddl = re.sub(r"--[^\n]*", "", ddl)
+    ddl = re.sub(r"\s+", " ", ddl)
+    ddl = ddl.replace("( ", "(").replace(" )", ")")
+    return ddl.replace(" IF NOT EXISTS", "")
+
+
+@functools.lru_cache(maxsize=8)
+def _schema_tables(schema_snapshot: str) -> Dict[str, str]:
+    """Splits a schema dump into {table: compact DDL}, with each table's indices."""
+    tables = {
+        m.group(1): _compact_ddl(m.group(0))
+        for m in _CREATE_TABLE_RE.finditer(schema_snapshot)
+    }
+    for m in _CREATE_INDEX_RE.finditer(schema_snapshot):
+        if m.group(1) in tables:
+            tables[m.group(1)] += "\n" + _compact_ddl(m.group(0))
+    return tables
+
+
+@functools.lru_cache(maxsize=8)
+def _compact_schema(schema_snapshot: str) -> str:
+    """
+    Reduces a schema dump to its table and index DDL, one statement per line.
+    Comments, alignment padding, pragmas and triggers only cost prompt tokens.
+    Falls back to the input if no tables can be parsed.
+    """
+    tables = _schema_tables(schema_snapshot)
+    return "\n".join(tables.values()) if tables else schema_snapshot
+
+
+@functools.lru_cache(maxsize=8)
+def _schema_references(schema_snapshot: str) -> Dict[str, Set[str]]:
+    """Maps each table to the tables its REFERENCES clauses point at."""
+    tables = _schema_tables(schema_snapshot)
+    return {
+        name: {t for t in _REFERENCES_RE.findall(ddl) if t in tables and t != name}
+        for name, ddl in tables.items()
+    }
+
+
+def _schema_subset(schema_snapshot: str, text: str) -> str:
+    """
+    Keeps the tables mentioned in `text` ("order items" and "order_item" both
+    match order_items), plus the tables a query over them may need to join:
+    tables that reference a mentioned one (order_items for orders), and every
+    table reachable from those through REFERENCES. Falls back to the full
+    schema if nothing matches.
+    """
+    tables = _schema_tables(schema_snapshot)
+    references = _schema_references(schema_snapshot)
+    mentioned = {
+        name
+        for name in tables
+        if re.search(
+            r"\b" + name.rstrip("s").replace("_", "[_ ]") + r"s?\b", text, re.IGNORECASE
+        )
+    }
+    if not mentioned:
+        return _compact_schema(schema_snapshot)
+
+    keep = mentioned | {
+        name for name, targets in references.items() if targets & mentioned
+    }
+    frontier = list(keep)
+    while frontier:
+        for target in references[frontier.pop()]:
+            if target not in keep:
+                keep.add(target)
+                frontier.append(target)
+    return "\n".join(ddl for name, ddl in tables.items() if name in keep)
+
+
+@functools.lru_cache(maxsize=8)
+def _canonical_examples(example_queries: str) -> str:
+    """
+    Normalizes line endings, trailing spaces and blank-line runs in the example
+    queries, so the SQL prompt's system prefix is byte-identical for every SQL
+    node and across runs, however the examples file was edited or saved.
+    """
+    lines = [line.rstrip() for line in example_queries.splitlines()]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+# --- Semantic Cache ---
+_request_embeddings: Dict[str, List[float]] = {}
+# Entries are loaded from disk once per process and kept in memory; lookups
+# use one normalized embedding matrix per (kind, context_key, literals).
+_semantic_entries: Optional[List[Dict[str, Any]]] = None
+_semantic_matrices: Dict[Tuple[Any, ...], Tuple[List[Dict[str, Any]], Any]] = {}
+# Quoted strings and numbers (ids, dates, top-N) in a request
+_LITERAL_RE = re.compile(r"'[^']*'|\"[^\"]*\"|\d+(?:[.,:/-]\d+)*")
+
+
+@functools.lru_cache(maxsize=8)
+def _context_key(general_context: str, schema_snapshot: str) -> str:
+    """Cached results are only reused against the same context and schema."""
+    context = f"{general_context}\0{schema_snapshot}"
+    return hashlib.sha256(context.encode("utf-8")).hexdigest()
+
+
+def _request_literals(user_request: str) -> Tuple[str, ...]:
+    """
+    Paraphrases embed alike even when their parameters differ ("customer 12"
+    vs "customer 13"), and cached plans carry those parameters in their input
+    hints, so a hit also requires the same literals.
+    """
+    return tuple(_LITERAL_RE.findall(user_request))
+
+
+async def _embed_request(user_request: str) -> List[float]:
+    if user_request not in _request_embeddings:
+        _request_embeddings[user_request] = await embeddings.aembed_query(user_request)
+    return _request_embeddings[user_request]
+
+
+def _load_semantic_cache() -> List[Dict[str, Any]]:
+    global _semantic_entries
+    if _semantic_entries is None:
+        _semantic_entries = (
+            orjson.loads(SEMANTIC_CACHE_PATH.read_bytes())
+            if SEMANTIC_CACHE_PATH.exists()
+            else []
+        )
+    return _semantic_entries
+
+
+def _semantic_matrix(
+    kind: str, context_key: str, literals: Tuple[str, ...]
+) -> Tuple[List[Dict[str, Any]], Any]:
+    key = (kind, context_key, literals)
+    if key not in _semantic_matrices:
+        entries = [
+            e
+            for e in _load_semantic_cache()
+            if e["kind"] == kind
+            and e["context_key"] == context_key
+            and tuple(e.get("literals", ())) == literals
+        ]
+        matrix = np.array([e["embedding"] for e in entries])
+        if entries:
+            matrix = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+        _semantic_matrices[key] = (entries, matrix)
+    return _semantic_matrices[key]
+
+
+async def _semantic_lookup(
+    user_request: str, context_key: str, kind: str
+) -> Optional[Any]:
+    """
+    Returns the stored `kind` result for the most similar earlier request with
+    the same literals, if its cosine similarity clears SEMANTIC_CACHE_THRESHOLD.
+    """
+    entries, matrix = _semantic_matrix(
+        kind, context_key, _request_literals(user_request)
+    )
+    if not entries:
+        return None
+
+    query = np.array(await _embed_request(user_request))
+    similarities = matrix @ (query / np.linalg.norm(query))
+    best = int(np.argmax(similarities))
+    if similarities[best] < SEMANTIC_CACHE_THRESHOLD:
+        return None
+    return entries[best]["value"]
+
+
+async def _semantic_cache_get(state: GraphState, kind: str) -> Optional[Any]:
+    return await _semantic_lookup(
+        state.user_request,
+        _context_key(state.general_context, state.schema_snapshot),
+        kind,
+    )
+
+
+async def _semantic_cache_put(state: GraphState, kind: str, value: Any) -> None:
+    embedding = await _embed_request(state.user_request)
+    context_key = _context_key(state.general_context, state.schema_snapshot)
+    literals = _request_literals(state.user_request)
+    entries = _load_semantic_cache()
+    entries.append(
+        {
+            "kind": kind,
+            "context_key": context_key,
+            "request": state.user_request,
+            "literals": list(literals),
+            "embedding": embedding,
+            "value": value,
+        }
+    )
+    _semantic_matrices.pop((kind, context_key, literals), None)
+
+    SEMANTIC_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    _IO_POOL.submit(
+        _write_atomic,
+        SEMANTIC_CACHE_PATH,
+        orjson.dumps(entries, option=orjson.OPT_SERIALIZE_NUMPY),
+    )
+
+
 # --- SQLite Executor (Allows Modifications) ---
+# SQL nodes run on worker threads, so each thread keeps its own long-lived
+# connection per database instead of reconnecting for every query.
+_thread_conns = threading.local()
+
+
+def _get_conn(db_path: str) -> sqlite3.Connection:
+    """Returns this thread's connection to `db_path`, opening it on first use."""
+    conns = getattr(_thread_conns, "conns", None)
+    if conns is None:
+        conns = _thread_conns.conns = {}
+    conn = conns.get(db_path)
+    if conn is None:
+        # Autocommit: every statement commits on its own, so a failed query
+        # never leaves a transaction open on the shared connection.
+        conn = sqlite3.connect(db_path, isolation_level=None)
+        # No journal_mode change: that is persisted in the database file, and
+        # these connections mostly read, so WAL would gain little here
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-64000")
+        conn.execute("PRAGMA mmap_size=268435456")
+        conns[db_path] = conn
+    return conn
+
+
 def _exec_sqlite(sql: str, db_path: str) -> Dict[str, Any]:
     """
     Executes a pure SQL string on a SQLite DB.
@@ -123,20 +510,28 @@ def _exec_sqlite(sql: str, db_path: str) -> Dict[str, Any]:
 
     t0 = time.time()
     try:
-        with sqlite3.connect(db_path) as conn:
-            cursor = conn.cursor()
-            # MODIFIED: Execute SQL directly without parameters
-            cursor.execute(sql)
-
-            if sql.strip().upper().startswith("SELECT"):
-                columns = [desc[0] for desc in cursor.description or []]
-                rows = cursor.fetchall()
-                result = {"columns": columns, "rows": rows}
-                row_count = len(rows)
-            else:
-                conn.commit()
-                result = None
-                row_count = cursor.rowcount
+        cursor = _get_conn(db_path).cursor()
+        # MODIFIED: Execute SQL directly without parameters
+        cursor.execute(sql)
+
+        # Any statement that returns rows (SELECT, WITH ... SELECT, PRAGMA,
+        # ... RETURNING) sets a description; plain modifications leave it None.
+        if cursor.description is not None:
+            columns = [desc[0] for desc in cursor.description]
+            rows = cursor.fetchmany(MAX_RESULT_ROWS)
+            row_count = len(rows)
+            # Count, but don't keep, whatever is left past the cap
+            while batch := cursor.fetchmany(MAX_RESULT_ROWS):
+                row_count += len(batch)
+            result = {
+                "columns": columns,
+                "rows": rows,
+                "row_count": row_count,
+                "truncated": row_count > len(rows),
+            }
+        else:
+            result = None
+            row_count = cursor.rowcount
 
     except Exception as e:
         return {"status": "fail", "error": str(e)}
@@ -149,235 +544,488 @@ def _exec_sqlite(sql: str, db_path: str) -> Dict[str, Any]:
     }
 
 
-# --- LangGraph Node Functions ---
-def process_analyzer(state: GraphState) -> GraphState:
-    """Generates the initial high-level process."""
-    out = process_analyzer_chain.invoke(
-        {
-            "user_request": state.user_request,
-            "general_context": state.general_context,
-            "schema_snapshot": state.schema_snapshot,
-        }
-    )
-    state.process = out.process
-    process_output_path = state.output_dir / "process.json"
-    with process_output_path.open("w", encoding="utf-8") as f:
-        json.dump(state.process, f, indent=2)
-    return state
+def _sample_result(result: Any) -> Any:
+    """
+    Shrinks a SQL result for the result analyzer prompt: the first
+    ANALYZER_SAMPLE_ROWS rows, the total row count and min/max of every
+    numeric column over the fetched rows.
+    """
+    if not isinstance(result, dict) or "rows" not in result:
+        return result
+    rows = result["rows"]
+    column_stats = {}
+    for i, column in enumerate(result["columns"]):
+        values = [
+            row[i]
+            for row in rows
+            if isinstance(row[i], (int, float)) and not isinstance(row[i], bool)
+        ]
+        if values:
+            column_stats[column] = {"min": min(values), "max": max(values)}
+    return {
+        "columns": result["columns"],
+        "rows": rows[:ANALYZER_SAMPLE_ROWS],
+        "row_count": result.get("row_count", len(rows)),
+        "column_stats": column_stats,
+    }
 
 
-def planner(state: GraphState) -> GraphState:
-    """Generates the structured DAG plan."""
-    out = planner_chain.invoke(
-        {
-            "user_request": state.user_request,
-            "process": "\n".join(state.process),
-            "general_context": state.general_context,
-            "schema_snapshot": state.schema_snapshot,
-        }
+# Run outputs are written off the critical path. Callers serialize first, so
+# later state mutations never race the write.
+_IO_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+def _store_process(state: GraphState, process: List[str]) -> None:
+    state.process = process
+    _IO_POOL.submit(
+        _write_atomic,
+        state.output_dir / "process.json",
+        orjson.dumps(state.process, option=orjson.OPT_INDENT_2),
     )
-    try:
-        nodes = json.loads(out.nodes)
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Planner returned invalid JSON for nodes: {e}")
+
+
+def _store_plan(state: GraphState, out: Any) -> None:
+    """Stores a planner output as `state.plan` and initialises node state."""
+    nodes = [node.model_dump() for node in out.nodes]
+    edges = _edges_from_csv(out.edges)
+    node_ids = {node["id"] for node in nodes}
+    unknown = {n for edge in edges for n in edge if n not in node_ids}
+    if unknown:
+        # The nodes' requires/produces are usually still consistent, so the
+        # edges are rebuilt from them instead of asking the planner again
+        edges = _edges_from_artifacts(nodes)
 
     state.plan = {
         "version": out.version,
         "nodes": nodes,
-        "edges": _edges_from_csv(out.edges),
+        "edges": edges,
     }
     for node in nodes:
         state.node_status[node["id"]] = NodeStatus()
+    state.pending_node_ids = [node["id"] for node in nodes]
 
-    plan_output_path = state.output_dir / "plan.json"
-    with plan_output_path.open("w", encoding="utf-8") as f:
-        json.dump(state.plan, f, indent=2)
-    return state
+    _IO_POOL.submit(
+        _write_atomic,
+        state.output_dir / "plan.json",
+        orjson.dumps(state.plan, option=orjson.OPT_INDENT_2),
+    )
 
+    _index_plan(state.plan)
 
-def select_node(state: GraphState) -> GraphState:
-    """Selects the next runnable node."""
-    runnable_nodes = _get_runnable_nodes(state)
-    state.current_node_id = runnable_nodes[0]["id"] if runnable_nodes else None
-    return state
 
+def _plan_from_cache(cached: Optional[Dict[str, Any]]) -> Optional[PlannerOutput]:
+    if cached is None:
+        return None
+    try:
+        return PlannerOutput(**cached)
+    except ValidationError:
+        # Entry written before plan nodes were a native list
+        return None
 
-def run_node(state: GraphState) -> GraphState:
-    """Executes the currently selected node."""
-    node_id = state.current_node_id
-    if not node_id:
-        return state
 
-    node = next(n for n in state.plan["nodes"] if n["id"] == node_id)
-    status = state.node_status[node_id]
-    status.state = "running"
-    status.attempts += 1
-    state.total_attempts += 1
+# --- LangGraph Node Functions ---
+async def bootstrap(state: GraphState) -> GraphState:
+    """
+    Generates the high-level process and the DAG plan in a single LLM call.
+    Falls back to the standalone planner only if the bundled plan's edges are
+    invalid and cannot be rebuilt from its nodes' requires/produces.
+    A bundle prefetched by `batch_plan_bundles` skips the call entirely.
+    """
+    if state.plan_bundle is not None:
+        out = PlanBundleOutput(**state.plan_bundle)
+    else:
+        # Process and plan are cached together, so a hit never mixes the
+        # results of two earlier requests
+        cached = await _semantic_cache_get(state, "bundle")
+        plan = _plan_from_cache(cached["plan"]) if cached else None
+        if plan is not None:
+            _store_process(state, cached["process"])
+            _store_plan(state, plan)
+            return state
 
-    # Prepare context for the node
-    required_artifacts_keys = _csv_to_list(node.get("requires", ""))
-    required_artifacts = {r: state.artifacts.get(r) for r in required_artifacts_keys}
+        out = await plan_bundle_chain.ainvoke(
+            {
+                "user_request": state.user_request,
+                "general_context": state.general_context,
+                "schema_snapshot": _compact_schema(state.schema_snapshot),
+            }
+        )
+    _store_process(state, out.process)
+    try:
+        _store_plan(state, out)
+    except ValueError:
+        return await planner(state)
+    plan = PlannerOutput(**out.model_dump(exclude={"process"}))
+    await _semantic_cache_put(
+        state, "bundle", {"process": out.process, "plan": plan.model_dump()}
+    )
+    return state
 
-    payload = {
-        "node_id": node_id,
-        "user_request": state.user_request,
-        "requires_csv": node.get("requires", ""),
-        "produces_csv": node.get("produces", ""),
-        "input_hints": node.get("input", ""),
-        "general_context": state.general_context,
-        "schema_snapshot": state.schema_snapshot,
-        "context_artifacts_json": json.dumps(required_artifacts, indent=2),
-    }
 
-    if node["type"].upper() == "ANALYZER":
-        out = analyzer_chain.invoke(payload)
-        try:
-            artifacts_to_add = json.loads(out.outputs)
-        except json.JSONDecodeError:
-            artifacts_to_add = {}
+async def batch_plan_bundles(
+    user_requests: List[str], general_context: str, schema_snapshot: str
+) -> List[Optional[Dict[str, Any]]]:
+    """
+    Plans several requests in one LLM call, paying for the shared static prefix
+    once. Requests with a cached bundle (same literals, similar wording) are
+    left out of the call and get None, so bootstrap serves them from the cache.
+    Returns all None if the reply does not line up with the requests, in which
+    case each run plans on its own.
+    """
+    context_key = _context_key(general_context, schema_snapshot)
 
-        # artifacts_to_add.update({"node_id": node_id})
+    async def is_cached(user_request: str) -> bool:
+        # Same lookup bootstrap does: one bundle entry, literals must match
+        cached = await _semantic_lookup(user_request, context_key, "bundle")
+        return cached is not None and _plan_from_cache(cached["plan"]) is not None
 
-        state.last_output = {
-            "status": out.status,
-            "artifacts": artifacts_to_add,
-            "notes": out.notes,
+    cached = await asyncio.gather(*(is_cached(r) for r in user_requests))
+    misses = [r for r, hit in zip(user_requests, cached) if not hit]
+    if not misses:
+        return [None] * len(user_requests)
+
+    out = await batch_plan_bundle_chain.ainvoke(
+        {
+            "user_requests_json": orjson.dumps(misses).decode(),
+            "general_context": general_context,
+            "schema_snapshot": _compact_schema(schema_snapshot),
         }
-        if out.status == "ok":
-            status.state = "succeeded"
-        else:
-            status.state = "failed"
-            status.last_error = f"Analyzer failed with status: {out.status}"
+    )
+    if len(out.bundles) != len(misses):
+        return [None] * len(user_requests)
+    bundles = iter(out.bundles)
+    return [None if hit else next(bundles).model_dump() for hit in cached]
+
 
-    elif node["type"].upper() == "SQL":
-        db_path = os.getenv("SQLITE_DB_PATH")
-        payload.update({"example_queries": state.example_queries})
-        out = sql_chain.invoke(payload)
+async def planner(state: GraphState) -> GraphState:
+    """Generates the structured DAG plan for an existing process."""
+    out = await planner_chain.ainvoke(
+        {
+            "user_request": state.user_request,
+            "process": "\n".join(state.process),
+            "general_context": state.general_context,
+            "schema_snapshot": _compact_schema(state.schema_snapshot),
+        }
+    )
+    _store_plan(state, out)
+    await _semantic_cache_put(
+        state, "bundle", {"process": state.process, "plan": out.model_dump()}
+    )
+    return state
 
-        state.executed_queries[node_id] = out.sql
 
-        exec_result = _exec_sqlite(out.sql, db_path)
+async def run_nodes(state: GraphState) -> GraphState:
+    """
+    Executes the plan with a ready queue: a node starts as soon as all of its
+    predecessors have succeeded, rather than when its whole dependency level
+    has finished, so one slow query does not hold up unrelated branches.
+    """
+    if not state.plan:
+        return state
 
-        artifacts_to_add = {}
-        produces = _csv_to_list(node.get("produces", ""))
-        sql_artifact_key = next(
-            (p for p in produces if p.lower().startswith("sql")), None
-        )
-        result_artifact_key = next(
-            (p for p in produces if p.lower().startswith("result")), None
+    plan = state.plan
+    nodes_by_id = plan["nodes_by_id"]
+    pending = set(state.pending_node_ids)
+    pending_deps = {
+        node_id: sum(
+            state.node_status.get(p, NodeStatus()).state != "succeeded"
+            for p in _get_predecessors(plan, node_id)
         )
+        for node_id in pending
+    }
 
-        if sql_artifact_key:
-            artifacts_to_add[sql_artifact_key] = out.sql
-        if (
-            result_artifact_key
-            and exec_result["status"] == "ok"
-            and exec_result.get("result")
-        ):
-            artifacts_to_add[result_artifact_key] = exec_result["result"]
+    # Running nodes have no dependencies on each other, so their LLM round
+    # trips can overlap; the semaphore keeps us under provider limits.
+    semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+    in_flight = set()
 
-        artifacts_to_add["node_id"] = node_id
+    async def run_bounded(node_id: str) -> Dict[str, Dict[str, Any]]:
+        async with semaphore:
+            return await _run_one(state, node_id)
 
-        state.last_output = {
-            "status": exec_result["status"],
-            "artifacts": artifacts_to_add,
-            "notes": out.notes,
-            "stats": exec_result.get("stats", {}),
-            "error": exec_result.get("error"),
-        }
-        if exec_result["status"] == "ok":
-            status.state = "succeeded"
-        else:
-            status.state = "failed"
-            status.last_error = exec_result.get("error", "SQL execution failed")
+    def start(node_id: str) -> None:
+        pending.discard(node_id)
+        in_flight.add(asyncio.create_task(run_bounded(node_id)))
 
-    elif node["type"].upper() == "SQL_RESULT_ANALYZER":
-        # Find the required result and the SQL that produced it
-        result_key = next(
-            (k for k in required_artifacts_keys if k.startswith("result_")), None
-        )
-        if not result_key:
-            status.state = "failed"
-            status.last_error = "SQL_RESULT_ANALYZER requires a 'result_*' artifact, but none was found."
-            state.last_output = {
-                "status": "fail",
-                "error": status.last_error,
-                "artifacts": {},
-            }
-            return state
+    # Each node's output is also written to artifacts/<node_id>.json as soon as
+    # it completes, so results can be inspected before the run ends
+    artifacts_dir = state.output_dir / "artifacts"
+    artifacts_dir.mkdir(exist_ok=True)
 
-        sql_query_for_result = {}
-        # Find the query that generated this result by looking at previous artifacts
-        # This is a simple heuristic; a more robust system might link them explicitly in the plan
-        for artifact_key, artifact_value in required_artifacts.items():
-            print(artifact_key)
-            print(artifact_value)
-            sql_query_for_result[artifact_key] = state.executed_queries[
-                artifact_value["node_id"]
-            ]
-
-        analyzer_payload = {
-            "user_request": state.user_request,
-            "sql_query": sql_query_for_result,
-            "sql_result_json": json.dumps(required_artifacts.get(result_key), indent=2),
-            "input_hints": node.get("input", ""),
-            "produces_csv": node.get("produces", ""),
-        }
+    for node in _get_runnable_nodes(state):
+        start(node["id"])
+
+    try:
+        while in_flight:
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            in_flight.difference_update(done)
+            for task in done:
+                outputs = task.result()
+                # A fused SQL_RESULT_ANALYZER runs inside its SQL node's task;
+                # it stops being pending only once it has actually run, so one
+                # skipped after a failed query is still reported as pending
+                pending.difference_update(outputs)
+                for node_id, output in outputs.items():
+                    _IO_POOL.submit(
+                        _write_atomic,
+                        artifacts_dir / f"{node_id}.json",
+                        orjson.dumps(output, option=orjson.OPT_INDENT_2),
+                    )
+                    if state.node_status[node_id].state != "succeeded":
+                        continue
+                    new_artifacts = output.get("artifacts", {})
+                    if isinstance(new_artifacts, dict):
+                        state.artifacts.update(new_artifacts)
+                    for succ in plan["succs"][node_id]:
+                        if succ not in pending:
+                            continue
+                        pending_deps[succ] -= 1
+                        if (
+                            pending_deps[succ] == 0
+                            and state.total_attempts < 20
+                            and _are_requirements_met(state, nodes_by_id[succ])
+                        ):
+                            start(succ)
+    except BaseException:
+        # Never leave tasks writing to the state after run_nodes has returned
+        for task in in_flight:
+            task.cancel()
+        await asyncio.gather(*in_flight, return_exceptions=True)
+        raise
+
+    state.pending_node_ids = [
+        node_id for node_id in state.pending_node_ids if node_id in pending
+    ]
+
+    if state.total_attempts >= 20:
+        state.issues.append({"reason": "max_attempts_exceeded"})
+    elif not all(s.state == "succeeded" for s in state.node_status.values()):
+        state.issues.append({"reason": "execution_stalled_due_to_failures"})
+    return state
 
-        out = sql_result_analyzer_chain.invoke(analyzer_payload)
-        try:
-            artifacts_to_add = json.loads(out.outputs)
-        except json.JSONDecodeError:
-            artifacts_to_add = {}
 
-        # artifacts_to_add.update({"node_id": node_id})
+async def _run_analyzer(
+    state: GraphState,
+    node: Dict[str, str],
+    status: NodeStatus,
+    payload: Dict[str, Any],
+    required_artifacts: Dict[str, Any],
+) -> Dict[str, Any]:
+    # Tagged so the CLI can stream the final answer and nothing else
+    is_final = node["id"] == state.plan.get("final_node_id")
+    out = await analyzer_chain.ainvoke(
+        payload, config={"tags": [FINAL_ANSWER_TAG]} if is_final else None
+    )
+    artifacts_to_add = {artifact.id: artifact.value for artifact in out.outputs}
+
+    # artifacts_to_add.update({"node_id": node_id})
 
-        state.last_output = {
-            "status": out.status,
-            "artifacts": artifacts_to_add,
-            "notes": out.notes,
+    output = {
+        "status": out.status,
+        "artifacts": artifacts_to_add,
+    }
+    if out.status == "ok":
+        status.state = "succeeded"
+    else:
+        status.state = "failed"
+        status.last_error = f"Analyzer failed with status: {out.status}"
+    return output
+
+
+async def _run_sql(
+    state: GraphState,
+    node: Dict[str, str],
+    status: NodeStatus,
+    payload: Dict[str, Any],
+    required_artifacts: Dict[str, Any],
+) -> Dict[str, Any]:
+    node_id = node["id"]
+    db_path = state.db_path or os.getenv("SQLITE_DB_PATH")
+    payload.update(
+        {
+            "schema_snapshot": _schema_subset(
+                state.schema_snapshot, node.get("input", "")
+            ),
+            "example_queries": _canonical_examples(state.example_queries),
         }
-        if out.status == "ok":
-            status.state = "succeeded"
-        else:
-            status.state = "failed"
-            status.last_error = "Result summarization failed."
+    )
+    out = await sql_chain.ainvoke(payload)
+
+    state.executed_queries[node_id] = out.sql
+
+    # sqlite3 blocks, so run it off the event loop to keep siblings moving
+    exec_result = await asyncio.to_thread(_exec_sqlite, out.sql, db_path)
+
+    artifacts_to_add = {}
+    produces_lower = [(p, p.lower()) for p in node["_produces"]]
+    sql_artifact_key = next(
+        (p for p, lower in produces_lower if lower.startswith("sql")), None
+    )
+    result_artifact_key = next(
+        (p for p, lower in produces_lower if lower.startswith("result")), None
+    )
 
+    if sql_artifact_key:
+        artifacts_to_add[sql_artifact_key] = out.sql
+    if (
+        result_artifact_key
+        and exec_result["status"] == "ok"
+        and exec_result.get("result")
+    ):
+        artifacts_to_add[result_artifact_key] = exec_result["result"]
+        state.artifact_to_sql[result_artifact_key] = out.sql
+
+    output = {
+        "status": exec_result["status"],
+        "artifacts": artifacts_to_add,
+        "stats": exec_result.get("stats", {}),
+        "error": exec_result.get("error"),
+    }
+    if exec_result["status"] == "ok":
+        status.state = "succeeded"
     else:
         status.state = "failed"
-        status.last_error = f"Unknown node type: {node['type']}"
-        state.last_output = {
+        status.last_error = exec_result.get("error", "SQL execution failed")
+    return output
+
+
+async def _run_sql_result_analyzer(
+    state: GraphState,
+    node: Dict[str, str],
+    status: NodeStatus,
+    payload: Dict[str, Any],
+    required_artifacts: Dict[str, Any],
+) -> Dict[str, Any]:
+    # Find the required result and the SQL that produced it
+    result_key = next((k for k in required_artifacts if k.startswith("result_")), None)
+    if not result_key:
+        status.state = "failed"
+        status.last_error = (
+            "SQL_RESULT_ANALYZER requires a 'result_*' artifact, but none was found."
+        )
+        return {
             "status": "fail",
             "error": status.last_error,
             "artifacts": {},
         }
 
-    return state
+    analyzer_payload = {
+        "user_request": state.user_request,
+        "sql_query": state.artifact_to_sql.get(result_key, ""),
+        "sql_result_json": orjson.dumps(
+            _sample_result(required_artifacts.get(result_key))
+        ).decode(),
+        "input_hints": node.get("input", ""),
+        "produces_csv": node.get("produces", ""),
+    }
 
+    out = await sql_result_analyzer_chain.ainvoke(analyzer_payload)
+    artifacts_to_add = {artifact.id: artifact.value for artifact in out.outputs}
 
-def resolve_data(state: GraphState) -> GraphState:
-    node_id = state.current_node_id
-    if not node_id:
-        return state
+    # artifacts_to_add.update({"node_id": node_id})
 
-    status = state.node_status[node_id]
-    if status.state == "succeeded" and state.last_output:
-        new_artifacts = state.last_output.get("artifacts", {})
-        if isinstance(new_artifacts, dict):
-            state.artifacts.update(new_artifacts)
-    return state
+    output = {
+        "status": out.status,
+        "artifacts": artifacts_to_add,
+    }
+    if out.status == "ok":
+        status.state = "succeeded"
+    else:
+        status.state = "failed"
+        status.last_error = "Result summarization failed."
+    return output
+
+
+async def _run_unknown(
+    state: GraphState,
+    node: Dict[str, str],
+    status: NodeStatus,
+    payload: Dict[str, Any],
+    required_artifacts: Dict[str, Any],
+) -> Dict[str, Any]:
+    status.state = "failed"
+    status.last_error = f"Unknown node type: {node['type']}"
+    return {
+        "status": "fail",
+        "error": status.last_error,
+        "artifacts": {},
+    }
 
 
-def should_continue(state: GraphState) -> str:
-    if state.total_attempts >= 20:
-        state.issues.append({"reason": "max_attempts_exceeded"})
-        return "end"
+_NODE_HANDLERS = {
+    "ANALYZER": _run_analyzer,
+    "SQL": _run_sql,
+    "SQL_RESULT_ANALYZER": _run_sql_result_analyzer,
+}
 
-    runnable_nodes = _get_runnable_nodes(state)
-    if not runnable_nodes:
-        all_succeeded = all(s.state == "succeeded" for s in state.node_status.values())
-        if not all_succeeded:
-            state.issues.append({"reason": "execution_stalled_due_to_failures"})
-        return "end"
 
-    return "continue"
+async def _run_one(
+    state: GraphState,
+    node_id: str,
+    upstream_artifacts: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Executes a node, and the SQL_RESULT_ANALYZER fused to it if any, and
+    returns their output records by node id. `upstream_artifacts` holds
+    outputs from earlier in the same task, not yet merged into the state.
+    """
+    node = state.plan["nodes_by_id"][node_id]
+    status = state.node_status[node_id]
+    status.state = "running"
+    status.attempts += 1
+    state.total_attempts += 1
+
+    # Prepare context for the node
+    sources = collections.ChainMap(upstream_artifacts or {}, state.artifacts)
+    required_artifacts = {r: sources.get(r) for r in node["_requires"]}
+
+    payload = {
+        "node_id": node_id,
+        "user_request": state.user_request,
+        "requires_csv": node.get("requires", ""),
+        "produces_csv": node.get("produces", ""),
+        "input_hints": node.get("input", ""),
+        "general_context": state.general_context,
+        "schema_snapshot": _compact_schema(state.schema_snapshot),
+        "context_artifacts_json": orjson.dumps(required_artifacts).decode(),
+    }
+
+    handler = _NODE_HANDLERS.get(node["type"].upper(), _run_unknown)
+    try:
+        output = await handler(state, node, status, payload, required_artifacts)
+    except Exception as e:
+        # An API or parsing error fails this node only; its siblings keep
+        # running and the run still ends with a final state
+        status.state = "failed"
+        status.last_error = f"{type(e).__name__}: {e}"
+        output = {"status": "fail", "error": status.last_error, "artifacts": {}}
+    outputs = {node_id: output}
+
+    fused_id = node.get("_fused_sra")
+    if fused_id and status.state == "succeeded":
+        fused = state.plan["nodes_by_id"][fused_id]
+        missing = [r for r in fused["_requires"] if r not in output["artifacts"]]
+        if missing:
+            # Same rule as an unfused node: never analyze a result that the
+            # query did not produce. That happens for statements that return
+            # no result set (INSERT, UPDATE, ...); a SELECT matching zero rows
+            # still yields a result with empty rows, which is analyzed.
+            fused_status = state.node_status[fused_id]
+            fused_status.state = "failed"
+            fused_status.last_error = (
+                f"SQL node {node_id} produced no {', '.join(missing)}"
+            )
+            outputs[fused_id] = {
+                "status": "fail",
+                "error": fused_status.last_error,
+                "artifacts": {},
+            }
+        else:
+            outputs.update(await _run_one(state, fused_id, output["artifacts"]))
+    return outputs
@@ -5,22 +5,31 @@ from dotenv import load_dotenv
 load_dotenv()
 
 import argparse
-import json
+import asyncio
+import functools
+import orjson
 import os
 import sqlite3
 import sys
 
-from workflow import run_workflow
+from workflow import arun_workflow
 
 
 def setup_database(db_path: str, schema_path: str):
     """Creates and initializes the SQLite database from a schema file."""
-    if os.path.exists(db_path):
-        os.remove(db_path)
+    # Drop any WAL files a previous copy may have left along with it
+    for path in (db_path, db_path + "-wal", db_path + "-shm"):
+        if os.path.exists(path):
+            os.remove(path)
     try:
         with open(schema_path, "r") as f:
             schema = f.read()
         conn = sqlite3.connect(db_path)
+        # Same pragmas as the workflow's connections (no persisted WAL mode);
+        # the schema script runs its own BEGIN/COMMIT, so it is applied in a
+        # single transaction
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
         conn.executescript(schema)
         conn.close()
         print(f"Database '{db_path}' created and schema applied.")
@@ -29,34 +38,35 @@ def setup_database(db_path: str, schema_path: str):
         sys.exit(1)
 
 
-def run(
+@functools.lru_cache(maxsize=None)
+def load_text(path: str) -> str:
+    """Reads a context file once; concurrent test runs share the same string."""
+    with open(path, "r") as f:
+        return f.read()
+
+
+async def arun(
     db: str,
     schema: str,
     request: str,
     id: str = None,
     description: str = None,
     examples: str = None,
+    plan_bundle: dict = None,
+    stream: bool = False,
 ):
     # 1. Setup Database
     # setup_database(args.db, args.schema)
-    os.environ["SQLITE_DB_PATH"] = db
+    # The path goes into the run's state rather than the process environment,
+    # so concurrent runs against different databases do not clobber each other
 
     # 2. Load General Context
-    if description:
-        with open(description, "r") as f:
-            general_context = f.read()
-    else:
-        general_context = ""
+    general_context = load_text(description) if description else ""
 
     # 3. Load Schema for LLM Context
-    with open(schema, "r") as f:
-        schema_text = f.read()
+    schema_text = load_text(schema)
 
-    if examples:
-        with open(examples, "r") as f:
-            example_queries = f.read()
-    else:
-        example_queries = ""
+    example_queries = load_text(examples) if examples else ""
 
     # 4. Get User Request
     user_request = request
@@ -72,8 +82,15 @@ def run(
     print(f"Request: {user_request}")
 
     # 4. Run the Workflow
-    final_state = run_workflow(
-        user_request, general_context, schema_text, example_queries, id=id
+    final_state = await arun_workflow(
+        user_request,
+        general_context,
+        schema_text,
+        example_queries,
+        id=id,
+        plan_bundle=plan_bundle,
+        stream_output=sys.stdout if stream else None,
+        db_path=db,
     )
 
     # 5. Print Summary
@@ -84,23 +101,45 @@ def run(
         for issue in final_state["issues"]:
             print(f"- {issue['reason']}")
 
+    # Only the artifacts whose text was actually streamed are skipped below
+    streamed_keys = set(final_state.get("streamed_artifacts", ()))
+
     print("\nFinal Artifacts:")
     artifacts = final_state.get("artifacts", {})
     if not artifacts:
         print("(None)")
     for key, value in artifacts.items():
         print(f"\n--- Artifact: {key} ---")
+        if key in streamed_keys:
+            print("(shown in the answer above)")
+            continue
         # Pretty print tables
         if isinstance(value, dict) and "columns" in value and "rows" in value:
             cols = value["columns"]
             rows = value["rows"]
             header = " | ".join(map(str, cols))
-            print(header)
-            print("-" * len(header))
-            for row in rows:
-                print(" | ".join(map(str, row)))
+            lines = [header, "-" * len(header)]
+            lines.extend(" | ".join(map(str, row)) for row in rows)
+            if value.get("truncated"):
+                lines.append(f"(showing {len(rows)} of {value['row_count']} rows)")
+            # One write for the whole table instead of a print per row
+            sys.stdout.write("\n".join(lines) + "\n")
         else:
-            print(json.dumps(value, indent=2))
+            print(orjson.dumps(value, option=orjson.OPT_INDENT_2).decode())
+
+
+def run(
+    db: str,
+    schema: str,
+    request: str,
+    id: str = None,
+    description: str = None,
+    examples: str = None,
+    stream: bool = False,
+):
+    return asyncio.run(
+        arun(db, schema, request, id, description, examples, stream=stream)
+    )
 
 
 def main():
@@ -120,6 +159,11 @@ def main():
         "--request",
         help="The natural language request. Reads from stdin if not provided.",
     )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Print the final answer as it is generated.",
+    )
     args = parser.parse_args()
 
     run(
@@ -129,6 +173,7 @@ def main():
         id=args.id,
         description=args.description,
         examples=args.examples,
+        stream=args.stream,
     )
 
 
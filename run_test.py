@@ -1,6 +1,22 @@
+import asyncio
 import json
+import os
 import subprocess
-from run import run
+from nodes import batch_plan_bundles
+from run import arun, load_text
+
+# Test cases are independent, so several run at once, up to this many
+MAX_CONCURRENT_TESTS = int(os.getenv("MAX_CONCURRENT_TESTS", "10"))
+# Requests planned together in one batched LLM call
+PLAN_BATCH_SIZE = int(os.getenv("PLAN_BATCH_SIZE", "4"))
+
+# Test complexity labels, in order of expected plan size
+COMPLEXITY_RANK = {"simple": 0, "moderate": 1, "complex": 2, "intensive": 3}
+
+DB_PATH = "data/logistics.db"
+SCHEMA_PATH = "data/db.sql"
+DESCRIPTION_PATH = "data/description.txt"
+EXAMPLES_PATH = "data/examples.sql"
 
 with open("data/test/test_2.json", "r") as f:
     test_data = json.load(f)
@@ -8,18 +24,84 @@ with open("data/test/test_2.json", "r") as f:
 test_requests = [t["description"] for t in test_data]
 
 
-for data in test_data[:1]:
+def predicted_size(data):
+    """Estimates a case's DAG size from its complexity label, then its length."""
+    return (
+        COMPLEXITY_RANK.get(data.get("complexity"), 1),
+        len(data["description"].split()),
+    )
+
+
+async def run_case(data, plan_bundle, semaphore: asyncio.Semaphore):
     request = data["description"]
     id = data["use_case_id"]
 
+    async with semaphore:
+        try:
+            await arun(
+                db=DB_PATH,
+                schema=SCHEMA_PATH,
+                request=request,
+                id=id,
+                description=DESCRIPTION_PATH,
+                examples=EXAMPLES_PATH,
+                plan_bundle=plan_bundle,
+            )
+        except Exception as e:
+            print(f"Executed request `{id}` failed. Error: {e}")
+
+
+async def plan_chunk(chunk, general_context, schema_snapshot):
     try:
-        run(
-            db="data/logistics.db",
-            schema="data/db.sql",
-            request=request,
-            id=id,
-            description="data/description.txt",
-            examples="data/examples.sql",
+        return await batch_plan_bundles(
+            [data["description"] for data in chunk], general_context, schema_snapshot
         )
     except Exception as e:
-        print(f"Executed request `{id}` failed. Error: {e}")
+        print(f"Batched planning failed, planning requests one by one. Error: {e}")
+        return [None] * len(chunk)
+
+
+async def run_chunk(chunk, plan_bundles, semaphore):
+    await asyncio.gather(
+        *(
+            run_case(data, plan_bundle, semaphore)
+            for data, plan_bundle in zip(chunk, plan_bundles)
+        )
+    )
+
+
+async def plan_and_run_chunk(chunk, general_context, schema_snapshot, semaphore):
+    plan_bundles = await plan_chunk(chunk, general_context, schema_snapshot)
+    await run_chunk(chunk, plan_bundles, semaphore)
+
+
+async def run_all(cases):
+    general_context = load_text(DESCRIPTION_PATH)
+    schema_snapshot = load_text(SCHEMA_PATH)
+
+    # A batched planning call waits for its largest plan, so cases of similar
+    # size are planned together; the largest go first so they do not end up
+    # as the tail of the run.
+    cases = sorted(cases, key=predicted_size, reverse=True)
+
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_TESTS)
+    chunks = [
+        cases[i : i + PLAN_BATCH_SIZE] for i in range(0, len(cases), PLAN_BATCH_SIZE)
+    ]
+    if not chunks:
+        return
+
+    # The first chunk is planned on its own so that its call puts the shared
+    # prompt prefix in Gemini's implicit cache before the other chunks send it;
+    # concurrent first calls would all miss.
+    first_bundles = await plan_chunk(chunks[0], general_context, schema_snapshot)
+    await asyncio.gather(
+        run_chunk(chunks[0], first_bundles, semaphore),
+        *(
+            plan_and_run_chunk(c, general_context, schema_snapshot, semaphore)
+            for c in chunks[1:]
+        ),
+    )
+
+
+asyncio.run(run_all(test_data[:1]))
@@ -1,19 +1,28 @@
 # workflow.py
+from langchain_core.utils.json import parse_partial_json
 from langgraph.graph import StateGraph, END
 from pydantic.json import pydantic_encoder
-import json
+import asyncio
+import orjson
 import os
 from pathlib import Path
 
 from models import GraphState
-from nodes import (
-    process_analyzer,
-    planner,
-    select_node,
-    run_node,
-    resolve_data,
-    should_continue,
-)
+from nodes import FINAL_ANSWER_TAG, bootstrap, run_nodes
+
+
+def _answer_outputs(partial_json: str) -> list:
+    """Returns the artifacts with a value so far in a partial analyzer reply."""
+    parsed = parse_partial_json(partial_json)
+    outputs = parsed.get("outputs") if isinstance(parsed, dict) else None
+    if not isinstance(outputs, list):
+        return []
+    return [o for o in outputs if isinstance(o, dict) and "value" in o]
+
+
+def _answer_text(partial_json: str) -> str:
+    """Joins the artifact values found so far in a partial analyzer reply."""
+    return "\n".join(str(o["value"]) for o in _answer_outputs(partial_json))
 
 
 def build_graph():
@@ -21,63 +30,109 @@ def build_graph():
     workflow = StateGraph(GraphState)
 
     # Add nodes
-    workflow.add_node("process_analyzer", process_analyzer)
-    workflow.add_node("planner", planner)
-    workflow.add_node("select_node", select_node)
-    workflow.add_node("run_node", run_node)
-    workflow.add_node("resolve_data", resolve_data)
-
-    # Define edges
-    workflow.set_entry_point("process_analyzer")
-    workflow.add_edge("process_analyzer", "planner")
-    workflow.add_edge("planner", "select_node")
-    workflow.add_edge("select_node", "run_node")
-    workflow.add_edge("run_node", "resolve_data")
-
-    # Conditional edge to loop or end
-    workflow.add_conditional_edges(
-        "resolve_data",
-        should_continue,
-        {"continue": "select_node", "end": END},
-    )
+    workflow.add_node("bootstrap", bootstrap)
+    workflow.add_node("run_nodes", run_nodes)
+
+    # Define edges; run_nodes schedules the whole DAG itself
+    workflow.set_entry_point("bootstrap")
+    workflow.add_edge("bootstrap", "run_nodes")
+    workflow.add_edge("run_nodes", END)
 
     return workflow.compile()
 
 
-def run_workflow(
+# The compiled graph holds no per-run state, so it is built once and shared by
+# every run instead of being recompiled per call
+_COMPILED_GRAPH = build_graph()
+
+
+async def arun_workflow(
     user_request: str,
     general_context: str,
     schema_snapshot: str,
     example_queries: str,
     id=None,
+    plan_bundle=None,
+    stream_output=None,
+    db_path=None,
 ):
-    """Initializes and runs the workflow, returning the final state."""
+    """Initializes and runs the workflow, returning the final state.
+
+    If stream_output is given (e.g. sys.stdout), the value of the final
+    ANALYZER's output is written to it as it is generated, and the returned
+    state's "streamed_artifacts" lists the ids of the artifacts that were
+    written. db_path is the database the SQL nodes query; it defaults to
+    $SQLITE_DB_PATH.
+    """
     if id:
         output_dir = Path(f"output/test/{id}")
     else:
         output_dir = Path(f"output/tmp")
     os.makedirs(output_dir, exist_ok=True)
 
-    graph = build_graph()
+    graph = _COMPILED_GRAPH
     initial_state = GraphState(
         output_dir=output_dir,
         user_request=user_request,
         general_context=general_context,
         schema_snapshot=schema_snapshot,
         example_queries=example_queries,
+        plan_bundle=plan_bundle,
+        db_path=db_path,
     )
 
-    # The output is an iterator, consume it to get the final state
-    final_state = None
-    for output in graph.stream(initial_state):
-        final_state = output
-
-    # The final state is the value of the last key in the output
-    final_state_value = list(final_state.values())[-1]
+    # The output is an async iterator, consume it to get the final state.
+    # "values" yields the full state after each step; "messages" yields the
+    # LLM token chunks, which we only need when streaming.
+    stream_mode = ["values", "messages"] if stream_output else ["values"]
+    final_state_value = None
+    answer_json = ""
+    streamed = ""
+    async for mode, chunk in graph.astream(initial_state, stream_mode=stream_mode):
+        if mode == "values":
+            final_state_value = chunk
+            continue
+        message, metadata = chunk
+        if FINAL_ANSWER_TAG not in metadata.get("tags", ()) or not message.content:
+            continue
+        # The reply is JSON; only the artifact values are meant for the reader
+        answer_json += message.content
+        answer = _answer_text(answer_json)
+        if answer.startswith(streamed) and len(answer) > len(streamed):
+            if not streamed:
+                stream_output.write("\n--- Answer ---\n")
+            stream_output.write(answer[len(streamed) :])
+            stream_output.flush()
+            streamed = answer
+    if streamed:
+        stream_output.write("\n")
 
-    # Save the final state for debugging
+    # Save the final state for debugging; the write runs off the event loop so
+    # concurrent runs are not blocked by a large state
     final_output_path = output_dir / "final_state.json"
-    with final_output_path.open("w", encoding="utf-8") as f:
-        json.dump(final_state_value, f, indent=2, default=pydantic_encoder)
+    await asyncio.to_thread(
+        final_output_path.write_bytes,
+        orjson.dumps(
+            final_state_value, option=orjson.OPT_INDENT_2, default=pydantic_encoder
+        ),
+    )
 
+    if stream_output:
+        shown = _answer_outputs(answer_json) if streamed else []
+        final_state_value["streamed_artifacts"] = [o["id"] for o in shown if "id" in o]
     return final_state_value
+
+
+def run_workflow(
+    user_request: str,
+    general_context: str,
+    schema_snapshot: str,
+    example_queries: str,
+    id=None,
+):
+    """Synchronous entry point; see arun_workflow."""
+    return asyncio.run(
+        arun_workflow(
+            user_request, general_context, schema_snapshot, example_queries, id=id
+        )
+    )